@@ -0,0 +1,129 @@
+"""
+Scalar multiplication on secp256k1 using the GLV endomorphism.
+
+The curve has an efficiently computable endomorphism
+phi((x, y)) = (beta*x, y) that is equivalent to multiplication by lambda.
+That allows splitting the scalar k into k1 + k2*lambda, with k1 and k2
+about half the size of k, and calculating k*P as k1*P + k2*phi(P) with
+half as many point doublings.
+
+See Gallant, Lambert, Vanstone: "Faster Point Multiplication on Elliptic
+Curves with Efficient Endomorphisms", CRYPTO 2001 and section 3.5 of
+Hankerson, Menezes, Vanstone: "Guide to Elliptic Curve Cryptography".
+
+Note that the sequence of operations performed here depends on the
+scalar: the precomputed table is indexed with the scalar digits and the
+point additions return early for the zero digits (and the other special
+cases), as is the case for the NAF multiplication in PointJacobi.
+"""
+
+from .ellipticcurve import PointJacobi, INFINITY
+from .curves import SECP256k1
+from .util import bit_length
+
+
+__all__ = ["glv_split", "glv_mul", "glv_mul_jacobi"]
+
+
+# beta is a cube root of unity in the field, lambda a cube root of unity
+# modulo the curve order, phi((x, y)) == lambda * (x, y)
+BETA = 0x7AE96A2B657C07106E64479EAC3434E99CF0497512F58995C1396C28719501EE
+LAMBDA = 0x5363AD4CC05C30E0A5261C028812645A122E22EA20816678DF02967C1B23BD72
+
+# short basis of the lattice {(x, y) | x + y * lambda == 0 mod n}
+A1 = 0x3086D221A7D46BCDE86C90E49284EB15
+B1 = -0xE4437ED6010E88286F547FA90ABFE4C3
+A2 = 0x114CA50F7A8E2F3F657C1108D9D44CFD8
+B2 = A1
+
+
+def glv_split(k, n=SECP256k1.order):
+    """
+    Split the scalar k into k1 and k2 such that k == k1 + k2 * lambda mod n.
+
+    Both k1 and k2 have absolute values of about sqrt(n), they may be
+    negative.
+    """
+    # rounded divisions
+    c1 = (2 * B2 * k + n) // (2 * n)
+    c2 = (-2 * B1 * k + n) // (2 * n)
+    k1 = k - c1 * A1 - c2 * A2
+    k2 = -c1 * B1 - c2 * B2
+    return k1, k2
+
+
+def glv_mul_jacobi(point, k):
+    """
+    Multiply a secp256k1 point by k, return the Jacobi coordinates.
+
+    Same as :func:`glv_mul`, but returns the raw coordinates of the
+    result, without creating a point object.
+
+    :return: X, Y and Z coordinates of k*point, Y or Z are 0 if the result
+        is the point at infinity
+    :rtype: tuple(int, int, int)
+    """
+    if not isinstance(point, PointJacobi):
+        point = PointJacobi.from_affine(point)
+    curve = point.curve()
+    n = SECP256k1.order
+    p = curve.p()
+    a = curve.a()
+    k1, k2 = glv_split(k % n, n)
+    sign1, sign2 = 1, 1
+    if k1 < 0:
+        k1, sign1 = -k1, -1
+    if k2 < 0:
+        k2, sign2 = -k2, -1
+
+    _double = point._double
+    _add = point._add
+
+    point.scale()
+    X1, Y1 = point.x(), point.y()
+    X2, Y2, Z2 = _double(X1, Y1, 1, p, a)
+    multiples = [
+        (0, 0, 1),
+        (X1, Y1, 1),
+        (X2, Y2, Z2),
+        _add(X1, Y1, 1, X2, Y2, Z2, p),
+    ]
+    table = []
+    for Xb, Yb, Zb in multiples:
+        # b * phi(P) == phi(b * P)
+        Xb, Yb = BETA * Xb % p, sign2 * Yb
+        for Xa, Ya, Za in multiples:
+            table.append(_add(Xa, sign1 * Ya, Za, Xb, Yb, Zb, p))
+
+    X3, Y3, Z3 = 0, 0, 1
+    # process the scalars from an even bit position
+    i = (max(bit_length(k1), bit_length(k2)) + 1) & ~1
+    while i > 0:
+        i -= 2
+        X3, Y3, Z3 = _double(X3, Y3, Z3, p, a)
+        X3, Y3, Z3 = _double(X3, Y3, Z3, p, a)
+        X2, Y2, Z2 = table[(k1 >> i & 3) + 4 * (k2 >> i & 3)]
+        X3, Y3, Z3 = _add(X3, Y3, Z3, X2, Y2, Z2, p)
+
+    return X3, Y3, Z3
+
+
+def glv_mul(point, k):
+    """
+    Multiply a secp256k1 point by k, using the GLV endomorphism.
+
+    Computes k1*P + k2*phi(P) with interleaved (Shamir's trick)
+    double-and-add, using a precomputed table of the 16 combinations
+    a*P + b*phi(P) for a, b in range(4), processing two bits of k1 and k2
+    in every step.
+
+    :param PointJacobi point: point on secp256k1
+    :param int k: scalar to multiply the point by
+
+    :return: k*point
+    :rtype: PointJacobi
+    """
+    X3, Y3, Z3 = glv_mul_jacobi(point, k)
+    if not Y3 or not Z3:
+        return INFINITY
+    return PointJacobi(SECP256k1.curve, X3, Y3, Z3, SECP256k1.order)
@@ -2,9 +2,16 @@
 Class for performing Elliptic-curve Diffie-Hellman (ECDH) operations.
 """
 
-from .util import number_to_string
-from .ellipticcurve import INFINITY
+import sys
+from binascii import unhexlify
+from hashlib import sha1
+from .util import randrange, bit_length
+from .numbertheory import inverse_mod
+from ._compat import normalise_bytes
+from .ellipticcurve import PointJacobi
 from .keys import SigningKey, VerifyingKey
+from .curves import SECP256k1
+from ._glv import glv_mul_jacobi
 
 
 __all__ = [
@@ -13,9 +20,112 @@ __all__ = [
     "NoCurveError",
     "InvalidCurveError",
     "InvalidSharedSecretError",
+    "generate_sharedsecret_batch",
 ]
 
 
+if sys.version_info >= (3,):
+
+    def _secret_to_bytes(secret, length):
+        """Convert the shared secret to big-endian bytes of given length."""
+        return int(secret).to_bytes(length, "big")
+
+
+else:
+
+    def _secret_to_bytes(secret, length):
+        """Convert the shared secret to big-endian bytes of given length."""
+        return unhexlify("%0*x" % (2 * length, secret))
+
+
+# fixed-base multiplication tables for curve generators, keyed by Curve
+_BASE_TABLES = {}
+
+
+def _base_table(curve):
+    """
+    Return the fixed-base multiplication table for the curve generator.
+
+    Row j of the table holds the affine coordinates of i * 256**j * G,
+    for i in range(256) (where (0, 0) stands for the point at infinity).
+    The table is calculated the first time it's needed.
+    """
+    try:
+        return _BASE_TABLES[curve]
+    except KeyError:
+        pass
+    base = PointJacobi.from_affine(curve.generator)
+    table = []
+    for _ in range((bit_length(curve.order) + 7) // 8):
+        row = [(0, 0)]
+        point = base
+        for _ in range(255):
+            point.scale()
+            row.append((point.x(), point.y()))
+            point = point + base
+        table.append(row)
+        # point == 256 * base now
+        base = point
+    _BASE_TABLES[curve] = table
+    return table
+
+
+def _base_mul(curve, k):
+    """Multiply the curve generator by k, 0 < k < order, using the table."""
+    table = _base_table(curve)
+    generator = curve.generator
+    _add = generator._add
+    p = curve.curve.p()
+    X3, Y3, Z3 = 0, 0, 1
+    for row in table:
+        X2, Y2 = row[k & 0xFF]
+        k >>= 8
+        X3, Y3, Z3 = _add(X3, Y3, Z3, X2, Y2, 1, p)
+    return PointJacobi(curve.curve, X3, Y3, Z3, curve.order)
+
+
+def _batch_inverse_mod(values, p):
+    """
+    Invert all the values modulo p using a single inversion.
+
+    Uses Montgomery's trick: the inverse of the product of all values is
+    calculated and then multiplied by the partial products to get the
+    inverses of individual values, so inverting n values costs one
+    inversion and 3*(n-1) multiplications.
+
+    :param list values: values to invert
+    :param int p: the prime modulus
+
+    :return: inverses of the values, 0 for values equal 0 mod p
+    :rtype: list
+    """
+    # partial products, zeros are skipped so that they don't
+    # zero out the inverses of the other values
+    prods = []
+    acc = 1
+    for val in values:
+        if val % p:
+            acc = acc * val % p
+        prods.append(acc)
+    acc_inv = inverse_mod(acc, p)
+    ret = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        val = values[i]
+        if not val % p:
+            continue
+        # acc_inv is the inverse of prods[i] here
+        if i:
+            ret[i] = acc_inv * prods[i - 1] % p
+        else:
+            ret[i] = acc_inv
+        acc_inv = acc_inv * val % p
+    return ret
+
+
+# maximum number of keys cached by ECDH.load_private_key_bytes()
+_SIGNING_KEYS_MAX = 32
+
+
 class NoKeyError(Exception):
     """ECDH. Key not found but it is needed for operation."""
 
@@ -42,6 +152,70 @@ class InvalidSharedSecretError(Exception):
     pass
 
 
+def generate_sharedsecret_batch(private_key, public_keys):
+    """
+    Calculate shared secrets between private key and many public keys.
+
+    Equivalent to calculating the shared secret with every one of the
+    public keys separately. On secp256k1 it's faster, as all the final
+    modular inversions (needed to convert the points to affine
+    coordinates) are done at once.
+
+    The function doesn't modify any shared state, so it can be called from
+    many threads at the same time. Note though, that the calculations are
+    performed while holding the GIL (both with Python integers and gmpy2),
+    so threads don't make them run in parallel; to use multiple CPU cores
+    split the public keys between multiple processes.
+
+    :param private_key: `my` private key
+    :type private_key: SigningKey
+    :param public_keys: `their` public keys
+    :type public_keys: iterable of VerifyingKey
+
+    :raises InvalidCurveError: a public key doesn't use the same curve as
+        the private key
+    :raises InvalidSharedSecretError: one of the shared secrets is the
+        point at infinity
+
+    :return: shared secrets, in the order of public keys
+    :rtype: list of int
+    """
+    curve = private_key.curve
+    k = private_key.privkey.secret_multiplier
+    points = []
+    for public_key in public_keys:
+        if public_key.curve != curve:
+            raise InvalidCurveError(
+                "Curves for public key and private key is not equal."
+            )
+        points.append(public_key.pubkey.point)
+
+    if curve is SECP256k1:
+        # GLV multiplication, see the note in ECDH._get_shared_secret()
+        p = curve.curve.p()
+        xs = []
+        zs = []
+        for point in points:
+            X, Y, Z = glv_mul_jacobi(point, k)
+            if not Y:
+                Z = 0
+            xs.append(X)
+            # Jacobi coordinates: x = X / Z**2
+            zs.append(Z * Z % p)
+        if not all(zs):
+            raise InvalidSharedSecretError(
+                "Invalid shared secret (INFINITY)."
+            )
+        return [
+            X * Z_inv % p for X, Z_inv in zip(xs, _batch_inverse_mod(zs, p))
+        ]
+
+    secrets = [(point * k).x() for point in points]
+    if None in secrets:
+        raise InvalidSharedSecretError("Invalid shared secret (INFINITY).")
+    return secrets
+
+
 class ECDH(object):
     """
     Elliptic-curve Diffie-Hellman (ECDH). A key agreement protocol.
@@ -50,7 +224,9 @@ class ECDH(object):
     pair, to establish a shared secret over an insecure channel
     """
 
-    def __init__(self, curve=None, private_key=None, public_key=None):
+    def __init__(
+        self, curve=None, private_key=None, public_key=None, precompute=False
+    ):
         """
         ECDH init.
 
@@ -65,8 +241,19 @@ class ECDH(object):
         :type private_key: SigningKey
         :param public_key:  `their` public key for ECDH
         :type public_key: VerifyingKey
+        :param bool precompute: use a precomputed table of generator
+            multiples in :func:`generate_private_key`. Speeds up key
+            generation about 3 times, but building the table (done once
+            per curve, on first use) costs as much as generating a few
+            hundred keys, so it's useful only when many keys are generated
         """
-        self.curve = curve
+        self._precompute = precompute
+        # SigningKey objects created by load_private_key_bytes(), keyed by
+        # the curve and the key encoding
+        self._signing_keys = {}
+        self.curve = None
+        if curve:
+            self.set_curve(curve)
         self.private_key = None
         self.public_key = None
         if private_key:
@@ -83,22 +270,47 @@ class ECDH(object):
             raise NoKeyError(
                 "Public key needs to be set to create shared secret"
             )
-        if not (
-            self.private_key.curve == self.curve == remote_public_key.curve
-        ):
+        curve = self.curve
+        # the keys use the very same Curve object in practically all cases,
+        # do the full comparison only if they don't
+        if (
+            self.private_key.curve is not curve
+            or remote_public_key.curve is not curve
+        ) and not (self.private_key.curve == curve == remote_public_key.curve):
             raise InvalidCurveError(
                 "Curves for public key and private key is not equal."
             )
 
+        k = self.private_key.privkey.secret_multiplier
+        point = remote_public_key.pubkey.point
+
         # shared secret = PUBKEYtheirs * PRIVATEKEYours
-        result = (
-            remote_public_key.pubkey.point
-            * self.private_key.privkey.secret_multiplier
-        )
-        if result == INFINITY:
+        if curve is not SECP256k1:
+            # INFINITY is the only point with x coordinate equal None,
+            # checking it is cheaper than comparing the points
+            x = (point * k).x()
+            if x is None:
+                raise InvalidSharedSecretError(
+                    "Invalid shared secret (INFINITY)."
+                )
+            return x
+
+        # secp256k1 has an efficient endomorphism, use it to halve
+        # the number of point doublings; note that the GLV multiplication
+        # uses secret-indexed table lookups and its sequence of operations
+        # depends on the scalar
+        X, Y, Z = glv_mul_jacobi(point, k)
+
+        # only the x coordinate of the result is needed, so calculate it
+        # directly from the Jacobi coordinates (x = X / Z**2), without
+        # creating a Point; Z == 0 is the point at infinity
+        p = curve.curve.p()
+        if not Y:
+            Z = 0
+        Z = Z * Z % p
+        if not Z:
             raise InvalidSharedSecretError("Invalid shared secret (INFINITY).")
-
-        return result.x()
+        return X * inverse_mod(Z, p) % p
 
     def set_curve(self, key_curve):
         """
@@ -120,7 +332,17 @@ class ECDH(object):
         """
         if not self.curve:
             raise NoCurveError("Curve must be set prior to key generation.")
-        return self.load_private_key(SigningKey.generate(curve=self.curve))
+        if not self._precompute:
+            return self.load_private_key(SigningKey.generate(curve=self.curve))
+        secexp = randrange(self.curve.order)
+        return self.load_private_key(
+            SigningKey._from_secret_exponent_and_point(
+                secexp,
+                _base_mul(self.curve, secexp),
+                self.curve,
+                sha1,
+            )
+        )
 
     def load_private_key(self, private_key):
         """
@@ -138,11 +360,11 @@ class ECDH(object):
         :rtype: VerifyingKey object
         """
         if not self.curve:
-            self.curve = private_key.curve
+            self.set_curve(private_key.curve)
         if self.curve != private_key.curve:
             raise InvalidCurveError("Curve mismatch.")
         self.private_key = private_key
-        return self.private_key.get_verifying_key()
+        return private_key.get_verifying_key()
 
     def load_private_key_bytes(self, private_key):
         """
@@ -150,7 +372,14 @@ class ECDH(object):
 
         Uses current curve and checks if the provided key matches
         the curve of ECDH key agreement.
-        Key loads via from_string method of SigningKey class
+        Key loads via from_string method of SigningKey class.
+
+        Creating the SigningKey requires calculating its public point,
+        so up to 32 most recently loaded keys (both the encodings and the
+        SigningKey objects) are kept by this ECDH object, also after
+        a different key is loaded, and loading the same key again reuses
+        the SigningKey created previously. Use
+        :func:`clear_private_key_cache` to remove them.
 
         :param private_key: private key in bytes string format
         :type private_key: :term:`bytes-like object`
@@ -162,9 +391,23 @@ class ECDH(object):
         """
         if not self.curve:
             raise NoCurveError("Curve must be set prior to key load.")
-        return self.load_private_key(
-            SigningKey.from_string(private_key, curve=self.curve)
-        )
+        private_key = bytes(normalise_bytes(private_key))
+        try:
+            signing_key = self._signing_keys[(self.curve, private_key)]
+        except KeyError:
+            signing_key = SigningKey.from_string(private_key, curve=self.curve)
+            if len(self._signing_keys) >= _SIGNING_KEYS_MAX:
+                self._signing_keys.clear()
+            self._signing_keys[(self.curve, private_key)] = signing_key
+        return self.load_private_key(signing_key)
+
+    def clear_private_key_cache(self):
+        """
+        Remove private keys cached by :func:`load_private_key_bytes`.
+
+        Doesn't affect the currently loaded private key.
+        """
+        self._signing_keys.clear()
 
     def load_private_key_der(self, private_key_der):
         """
@@ -185,7 +428,9 @@ class ECDH(object):
         :return: public (verifying) key from this private key.
         :rtype: VerifyingKey object
         """
-        return self.load_private_key(SigningKey.from_der(private_key_der))
+        return self.load_private_key(
+            SigningKey.from_der(private_key_der, curve_hint=self.curve)
+        )
 
     def load_private_key_pem(self, private_key_pem):
         """
@@ -206,7 +451,9 @@ class ECDH(object):
         :return: public (verifying) key from this private key.
         :rtype: VerifyingKey object
         """
-        return self.load_private_key(SigningKey.from_pem(private_key_pem))
+        return self.load_private_key(
+            SigningKey.from_pem(private_key_pem, curve_hint=self.curve)
+        )
 
     def get_public_key(self):
         """
@@ -226,13 +473,18 @@ class ECDH(object):
         Needs to have the same curve as set as current for ecdh operation.
         If curve is not set - it sets it from VerifyingKey.
 
+        The point itself is validated when the VerifyingKey is created,
+        the shared secret calculation only checks (by identity) that the
+        key is still on the ECDH curve, so there is no validation result
+        worth remembering here.
+
         :param public_key: Initialised VerifyingKey class
         :type public_key: VerifyingKey
 
         :raises InvalidCurveError: public_key curve not the same as self.curve
         """
         if not self.curve:
-            self.curve = public_key.curve
+            self.set_curve(public_key.curve)
         if self.curve != public_key.curve:
             raise InvalidCurveError("Curve mismatch.")
         self.public_key = public_key
@@ -268,7 +520,7 @@ class ECDH(object):
         :raises InvalidCurveError: public_key curve not the same as self.curve
         """
         return self.load_received_public_key(
-            VerifyingKey.from_der(public_key_der)
+            VerifyingKey.from_der(public_key_der, curve_hint=self.curve)
         )
 
     def load_received_public_key_pem(self, public_key_pem):
@@ -287,7 +539,7 @@ class ECDH(object):
         :raises InvalidCurveError: public_key curve not the same as self.curve
         """
         return self.load_received_public_key(
-            VerifyingKey.from_pem(public_key_pem)
+            VerifyingKey.from_pem(public_key_pem, curve_hint=self.curve)
         )
 
     def generate_sharedsecret_bytes(self):
@@ -303,10 +555,40 @@ class ECDH(object):
         :return: shared secret
         :rtype: byte string
         """
-        return number_to_string(
-            self.generate_sharedsecret(), self.private_key.curve.order
+        # the keys were checked to use self.curve by generate_sharedsecret()
+        return _secret_to_bytes(
+            self.generate_sharedsecret(), self.curve.baselen
         )
 
+    def generate_sharedsecret_batch(self, public_keys):
+        """
+        Generate shared secrets from local private key and many public keys.
+
+        Faster than loading the public keys and generating the shared
+        secrets one by one, see :func:`generate_sharedsecret_batch`.
+        The public key set with :func:`load_received_public_key` is not used.
+
+        :param public_keys: remote public keys
+        :type public_keys: iterable of VerifyingKey
+
+        :raises InvalidCurveError: public_key curve not the same as self.curve
+        :raises NoKeyError: private_key is not set
+        :raises InvalidSharedSecretError: one of the shared secrets is the
+            point at infinity
+
+        :return: shared secrets, in the order of public keys
+        :rtype: list of int
+        """
+        if not self.private_key:
+            raise NoKeyError(
+                "Private key needs to be set to create shared secret"
+            )
+        if self.private_key.curve != self.curve:
+            raise InvalidCurveError(
+                "Curves for public key and private key is not equal."
+            )
+        return generate_sharedsecret_batch(self.private_key, public_keys)
+
     def generate_sharedsecret(self):
         """
         Generate shared secret from local private key and remote public key.
@@ -5,9 +5,10 @@ import pytest
 from binascii import hexlify, unhexlify
 
 from .curves import NIST192p, NIST224p, NIST256p, NIST384p, NIST521p
-from .curves import curves
+from .curves import curves, SECP256k1
 from .ecdh import ECDH, InvalidCurveError, InvalidSharedSecretError, NoKeyError
-from .keys import SigningKey, VerifyingKey
+from .ecdh import _base_mul, _batch_inverse_mod, generate_sharedsecret_batch
+from .keys import SigningKey, VerifyingKey, MalformedPointError
 
 
 @pytest.mark.parametrize(
@@ -26,6 +27,134 @@ def test_ecdh_each(vcurve):
     assert secret1 == secret2
 
 
+@pytest.mark.parametrize(
+    "vcurve", curves, ids=[curve.name for curve in curves]
+)
+def test_ecdh_precompute(vcurve):
+    ecdh1 = ECDH(curve=vcurve, precompute=True)
+    ecdh2 = ECDH(curve=vcurve)
+
+    pub1 = ecdh1.generate_private_key()
+    secexp = ecdh1.private_key.privkey.secret_multiplier
+    assert pub1.pubkey.point == vcurve.generator * secexp
+
+    ecdh1.load_received_public_key(ecdh2.generate_private_key())
+    ecdh2.load_received_public_key(pub1)
+
+    assert (
+        ecdh1.generate_sharedsecret_bytes()
+        == ecdh2.generate_sharedsecret_bytes()
+    )
+
+
+def test_base_mul():
+    for k in (1, 2, 255, 256, 257, NIST256p.order - 1):
+        assert _base_mul(NIST256p, k) == NIST256p.generator * k
+
+
+@pytest.mark.parametrize(
+    "vcurve", curves, ids=[curve.name for curve in curves]
+)
+def test_ecdh_batch(vcurve):
+    ecdh1 = ECDH(curve=vcurve)
+    ecdh1.generate_private_key()
+    peers = [ECDH(curve=vcurve) for _ in range(3)]
+    public_keys = [peer.generate_private_key() for peer in peers]
+    for peer in peers:
+        peer.load_received_public_key(ecdh1.get_public_key())
+
+    secrets = ecdh1.generate_sharedsecret_batch(public_keys)
+
+    assert secrets == [peer.generate_sharedsecret() for peer in peers]
+    assert ecdh1.generate_sharedsecret_batch([]) == []
+
+
+def test_ecdh_batch_free_function():
+    ecdh1 = ECDH(curve=NIST256p)
+    ecdh1.generate_private_key()
+    ecdh2 = ECDH(curve=NIST256p)
+    ecdh1.load_received_public_key(ecdh2.generate_private_key())
+
+    assert generate_sharedsecret_batch(
+        ecdh1.private_key, [ecdh1.public_key, ecdh1.public_key]
+    ) == [ecdh1.generate_sharedsecret()] * 2
+
+
+def test_ecdh_batch_wrong_curve():
+    ecdh1 = ECDH(curve=NIST192p)
+    ecdh1.generate_private_key()
+    ecdh2 = ECDH(curve=NIST256p)
+
+    with pytest.raises(InvalidCurveError):
+        ecdh1.generate_sharedsecret_batch(
+            [ecdh1.get_public_key(), ecdh2.generate_private_key()]
+        )
+
+
+def test_ecdh_batch_no_private_key():
+    ecdh1 = ECDH(curve=NIST192p)
+
+    with pytest.raises(NoKeyError):
+        ecdh1.generate_sharedsecret_batch([])
+
+
+def test_ecdh_batch_infinity():
+    ecdh1 = ECDH(curve=NIST256p)
+    ecdh1.generate_private_key()
+    ecdh1.private_key.privkey.secret_multiplier = NIST256p.order
+
+    with pytest.raises(InvalidSharedSecretError):
+        ecdh1.generate_sharedsecret_batch(
+            [SigningKey.generate(NIST256p).get_verifying_key()]
+        )
+
+
+def test_ecdh_curve_assigned_directly():
+    ecdh1 = ECDH()
+    ecdh1.curve = NIST384p
+    ecdh1.private_key = SigningKey.generate(NIST384p)
+    ecdh2 = ECDH(curve=NIST384p)
+    ecdh1.public_key = ecdh2.generate_private_key()
+    ecdh2.load_received_public_key(ecdh1.get_public_key())
+
+    assert ecdh1.generate_sharedsecret() == ecdh2.generate_sharedsecret()
+    assert (
+        ecdh1.generate_sharedsecret_bytes()
+        == ecdh2.generate_sharedsecret_bytes()
+    )
+
+
+def test_ecdh_curve_reassigned():
+    ecdh1 = ECDH(curve=NIST256p)
+    ecdh1.curve = NIST384p
+    ecdh1.generate_private_key()
+    ecdh2 = ECDH(curve=NIST384p)
+    ecdh1.load_received_public_key(ecdh2.generate_private_key())
+    ecdh2.load_received_public_key(ecdh1.get_public_key())
+
+    assert ecdh1.generate_sharedsecret() == ecdh2.generate_sharedsecret()
+    secret = ecdh1.generate_sharedsecret_bytes()
+    assert len(secret) == NIST384p.baselen
+    assert secret == ecdh2.generate_sharedsecret_bytes()
+
+
+def test_batch_inverse_mod():
+    p = NIST256p.curve.p()
+    values = [3, 0, p - 1, 2 ** 200, p, 1]
+
+    inverses = _batch_inverse_mod(values, p)
+
+    assert inverses[1] == 0
+    assert inverses[4] == 0
+    for val, val_inv in zip(values, inverses):
+        if val % p:
+            assert val * val_inv % p == 1
+
+
+def test_batch_inverse_mod_empty():
+    assert _batch_inverse_mod([], NIST256p.curve.p()) == []
+
+
 def test_ecdh_no_public_key():
     ecdh1 = ECDH(curve=NIST192p)
 
@@ -60,12 +189,44 @@ def test_ecdh_wrong_public_key_curve():
         ecdh2.generate_sharedsecret_bytes()
 
 
-def test_ecdh_invalid_shared_secret_curve():
-    ecdh1 = ECDH(curve=NIST256p)
+def test_ecdh_load_private_key_bytes_cached():
+    private_key = SigningKey.generate(NIST192p)
+    ecdh1 = ECDH(curve=NIST192p)
+
+    public_key = ecdh1.load_private_key_bytes(private_key.to_string())
+    first_private_key = ecdh1.private_key
+    ecdh1.load_private_key_bytes(bytearray(private_key.to_string()))
+
+    assert ecdh1.private_key is first_private_key
+    assert public_key == private_key.get_verifying_key()
+    assert ecdh1.get_public_key() == public_key
+
+    ecdh1.clear_private_key_cache()
+
+    assert ecdh1._signing_keys == {}
+    assert ecdh1.get_public_key() == public_key
+
+
+def test_ecdh_load_private_key_bytes_wrong_curve():
+    private_key = SigningKey.generate(NIST192p)
+    ecdh1 = ECDH(curve=NIST192p)
+    ecdh2 = ECDH(curve=NIST256p)
+
+    ecdh1.load_private_key_bytes(private_key.to_string())
+
+    with pytest.raises(MalformedPointError):
+        ecdh2.load_private_key_bytes(private_key.to_string())
+
+
+@pytest.mark.parametrize(
+    "vcurve", [NIST256p, SECP256k1], ids=[NIST256p.name, SECP256k1.name]
+)
+def test_ecdh_invalid_shared_secret_curve(vcurve):
+    ecdh1 = ECDH(curve=vcurve)
     ecdh1.generate_private_key()
 
     ecdh1.load_received_public_key(
-        SigningKey.generate(NIST256p).get_verifying_key()
+        SigningKey.generate(vcurve).get_verifying_key()
     )
 
     ecdh1.private_key.privkey.secret_multiplier = ecdh1.private_key.curve.order
@@ -265,6 +426,26 @@ def test_ecdh_der():
     assert sharedsecret == unhexlify(gshared_secret)
 
 
+def test_ecdh_der_wrong_curve():
+    ecdh = ECDH(curve=NIST256p)
+
+    with pytest.raises(InvalidCurveError):
+        ecdh.load_private_key_der(unhexlify(der_local_private_key))
+
+    with pytest.raises(InvalidCurveError):
+        ecdh.load_received_public_key_der(unhexlify(der_remote_public_key))
+
+
+def test_ecdh_der_with_curve():
+    ecdh = ECDH(curve=NIST192p)
+    ecdh.load_private_key_der(unhexlify(der_local_private_key))
+    ecdh.load_received_public_key_der(unhexlify(der_remote_public_key))
+
+    sharedsecret = ecdh.generate_sharedsecret_bytes()
+
+    assert sharedsecret == unhexlify(gshared_secret)
+
+
 # Exception classes used by run_openssl.
 class RunOpenSslError(Exception):
     pass
@@ -0,0 +1,51 @@
+import pytest
+import hypothesis.strategies as st
+from hypothesis import given, settings
+
+from .curves import SECP256k1
+from .ellipticcurve import INFINITY
+from ._glv import glv_split, glv_mul, BETA, LAMBDA
+
+
+def test_endomorphism():
+    generator = SECP256k1.generator
+    p = SECP256k1.curve.p()
+
+    point = generator * LAMBDA
+
+    assert point.x() == BETA * generator.x() % p
+    assert point.y() == generator.y()
+
+
+@settings(max_examples=50)
+@given(st.integers(min_value=0, max_value=SECP256k1.order - 1))
+def test_glv_split(k):
+    n = SECP256k1.order
+
+    k1, k2 = glv_split(k)
+
+    assert (k1 + k2 * LAMBDA - k) % n == 0
+    assert abs(k1) < 2 ** 129
+    assert abs(k2) < 2 ** 129
+
+
+@settings(max_examples=20)
+@given(st.integers(min_value=1, max_value=SECP256k1.order - 1))
+def test_glv_mul(k):
+    point = SECP256k1.generator * 0xDEADBEEF
+
+    assert glv_mul(point, k) == point * k
+
+
+@pytest.mark.parametrize(
+    "k", [1, 2, 3, 4, 5, SECP256k1.order - 1, SECP256k1.order + 1]
+)
+def test_glv_mul_small_scalars(k):
+    generator = SECP256k1.generator
+
+    assert glv_mul(generator, k) == generator * k
+
+
+@pytest.mark.parametrize("k", [0, SECP256k1.order])
+def test_glv_mul_infinity(k):
+    assert glv_mul(SECP256k1.generator, k) == INFINITY
@@ -24,7 +24,7 @@ from .util import (
     sigdecode_der,
     sigdecode_strings,
 )
-from .curves import NIST256p
+from .curves import NIST192p, NIST256p
 
 
 class TestVerifyingKeyFromString(unittest.TestCase):
@@ -160,6 +160,23 @@ class TestVerifyingKeyFromDer(unittest.TestCase):
 
         self.assertIs(vk.default_hashfunc, hashlib.sha256)
 
+    def test_from_der_with_curve_hint(self):
+        vk = VerifyingKey.from_der(self.key_bytes, curve_hint=NIST192p)
+
+        self.assertIs(vk.curve, NIST192p)
+        self.assertEqual(vk, self.vk)
+
+    def test_from_der_with_other_curve_hint(self):
+        vk = VerifyingKey.from_der(self.key_bytes, curve_hint=NIST256p)
+
+        self.assertIs(vk.curve, NIST192p)
+        self.assertEqual(vk, self.vk)
+
+    def test_from_pem_with_curve_hint(self):
+        vk = VerifyingKey.from_pem(self.key_pem, curve_hint=NIST192p)
+
+        self.assertEqual(vk, self.vk)
+
     def test_bytes(self):
         vk = VerifyingKey.from_der(self.key_bytes)
 
@@ -410,6 +427,25 @@ def test_SigningKey_from_der(convert):
     assert sk.to_string() == prv_key_bytes
 
 
+@pytest.mark.parametrize("curve_hint", [NIST192p, NIST256p])
+def test_SigningKey_from_der_with_curve_hint(curve_hint):
+    sk = SigningKey.from_der(key_bytes, curve_hint=curve_hint)
+
+    assert sk.curve is NIST192p
+    assert sk.to_string() == prv_key_bytes
+
+
+@pytest.mark.parametrize("curve_hint", [NIST192p, NIST256p])
+def test_SigningKey_from_pkcs8_der_with_curve_hint(curve_hint):
+    sk = SigningKey.from_der(key_bytes)
+    der = sk.to_der(format="pkcs8")
+
+    sk2 = SigningKey.from_der(der, curve_hint=curve_hint)
+
+    assert sk2.curve is NIST192p
+    assert sk2 == sk
+
+
 # test SigningKey.sign_deterministic()
 extra_entropy = b"\x0a\x0b\x0c\x0d\x0e\x0f\x10\x11"
 